@@ -0,0 +1,70 @@
+import os
+import argparse
+import numpy as np
+import tqdm
+
+from utils.datasets.initialization import get_dataset
+from configs import get_config
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--config_file",
+                    default="configs/lidog/single/synth4d-kitti.yaml",
+                    type=str,
+                    help="Path to config file")
+parser.add_argument("--cache_path",
+                    default="cache/",
+                    type=str,
+                    help="Where to write the memory-mapped caches (one folder per source dataset)")
+
+
+def write_cache(dataset, cache_path):
+    r"""
+    Writes all the scans of dataset in one contiguous file, so that training reads
+    them with a slice of a memory-mapped array instead of opening and parsing files.
+    points.mmap: float32 [N_tot, 4] xyz + intensity
+    labels.mmap: int32 [N_tot] mapped labels
+    meta.npz: scan files and dataset parameters used to build the cache, checked when loading it
+    offsets.npy: int64 [len(dataset)+1], scan i is in [offsets[i], offsets[i+1])
+    """
+    os.makedirs(cache_path, exist_ok=True)
+
+    offsets = np.zeros(len(dataset) + 1, dtype=np.int64)
+
+    with open(os.path.join(cache_path, 'points.mmap'), 'wb') as f_pts, \
+            open(os.path.join(cache_path, 'labels.mmap'), 'wb') as f_lbl:
+        for i in tqdm.tqdm(range(len(dataset)), desc=f'Caching {cache_path}', leave=True):
+            points, labels = dataset.load_raw(i)
+            f_pts.write(np.ascontiguousarray(points, dtype=np.float32).tobytes())
+            f_lbl.write(np.ascontiguousarray(labels, dtype=np.int32).tobytes())
+            offsets[i + 1] = offsets[i] + points.shape[0]
+
+    np.savez(os.path.join(cache_path, 'meta.npz'), **dataset.cache_meta())
+
+    # written last, a partial cache is never picked up
+    np.save(os.path.join(cache_path, 'offsets.npy'), offsets)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    config = get_config(args.config_file)
+
+    try:
+        bound_2d = config.pipeline.bound_2d
+    except AttributeError:
+        bound_2d = 50.
+
+    for dataset_name in config.source_dataset.name:
+        training_dataset, _ = get_dataset(dataset_name=dataset_name,
+                                          voxel_size=config.source_dataset.voxel_size,
+                                          sub_p=config.source_dataset.sub_p,
+                                          num_classes=config.model.out_channels,
+                                          ignore_label=config.source_dataset.ignore_label,
+                                          use_cache=False,
+                                          augmentation_list=None,
+                                          scale_bev=config.pipeline.scale_bev,
+                                          decoder_2d_levels=config.model.decoder_2d_levels,
+                                          bev_img_sizes=config.model.bev_img_sizes,
+                                          bound_2d=bound_2d)
+
+        write_cache(training_dataset, os.path.join(args.cache_path, dataset_name))
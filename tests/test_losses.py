@@ -0,0 +1,58 @@
+import math
+
+import pytest
+
+torch = pytest.importorskip('torch')
+
+from utils.losses.losses import CELoss, fused_bev_ce
+
+
+def _random_levels(num_classes, ignore_label, sizes, seed=0):
+    g = torch.Generator().manual_seed(seed)
+    preds, labels = {}, {}
+    for l, (b, h, w) in enumerate(sizes):
+        key = f'level{l}'
+        preds[key] = torch.randn(b, h, w, num_classes, generator=g)
+        labels[key] = torch.randint(0, num_classes, (b, h, w), generator=g)
+        # some ignored pixels in each level
+        labels[key][torch.rand(b, h, w, generator=g) < 0.3] = ignore_label
+    return preds, labels
+
+
+def test_fused_bev_ce_matches_celoss():
+    num_classes, ignore_label = 7, -1
+    preds, labels = _random_levels(num_classes, ignore_label, [(2, 16, 16), (2, 8, 8), (2, 4, 4)])
+
+    criterion = CELoss(ignore_label=ignore_label)
+    fused = fused_bev_ce(preds, labels, num_classes=num_classes, ignore_label=ignore_label)
+
+    for key in labels.keys():
+        expected = criterion(preds[key].view(-1, num_classes), labels[key].view(-1))
+        assert torch.allclose(fused[key], expected, atol=1e-5)
+
+
+def test_fused_bev_ce_bfloat16_logits():
+    num_classes, ignore_label = 7, -1
+    preds, labels = _random_levels(num_classes, ignore_label, [(4, 128, 128), (4, 64, 64)])
+
+    criterion = CELoss(ignore_label=ignore_label)
+    fused = fused_bev_ce({k: v.bfloat16() for k, v in preds.items()}, labels,
+                         num_classes=num_classes, ignore_label=ignore_label)
+
+    for key in labels.keys():
+        expected = criterion(preds[key].view(-1, num_classes), labels[key].view(-1))
+        assert fused[key].dtype == torch.float32
+        assert torch.allclose(fused[key], expected, rtol=1e-2)
+
+
+def test_fused_bev_ce_all_ignored_level_is_nan():
+    num_classes, ignore_label = 7, -1
+    preds, labels = _random_levels(num_classes, ignore_label, [(2, 8, 8), (2, 4, 4)])
+    labels['level1'][:] = ignore_label
+
+    criterion = CELoss(ignore_label=ignore_label)
+    fused = fused_bev_ce(preds, labels, num_classes=num_classes, ignore_label=ignore_label)
+
+    assert math.isnan(criterion(preds['level1'].view(-1, num_classes), labels['level1'].view(-1)).item())
+    assert math.isnan(fused['level1'].item())
+    assert not math.isnan(fused['level0'].item())
@@ -1,12 +1,13 @@
 import os
+import re
 import time
 import argparse
 import numpy as np
+from threadpoolctl import threadpool_limits
 
 import torch
 from torch.utils.data import DataLoader
 from pytorch_lightning import Trainer
-from pytorch_lightning.callbacks import ModelCheckpoint
 from pytorch_lightning.loggers import WandbLogger
 import MinkowskiEngine as ME
 
@@ -15,8 +16,14 @@ from utils.datasets.initialization import get_dataset
 from utils.datasets.synth4d_bev import MultiBEVSourceDataset
 from configs import get_config
 from utils.collation import CollateFN, CollateFNSingleSourceBEVMultiLevel, CollateFNMultiSourceBEVMultiLevel
+from utils.common.prefetch import CUDAPrefetcher
+from utils.common.checkpoint import AsyncModelCheckpoint
 from utils.pipelines import PLTTrainer2D, PLTTrainer2DMulti
 
+# TF32 for the matmuls/convs that stay in FP32
+if hasattr(torch, 'set_float32_matmul_precision'):
+    torch.set_float32_matmul_precision('high')
+
 parser = argparse.ArgumentParser()
 parser.add_argument("--config_file",
                     default="configs/source/semantickitti.yaml",
@@ -29,15 +36,36 @@ parser.add_argument("--auto_resume",
                     help="Automatically resume training from last checkpoint")
 
 
+def worker_init(worker_id):
+    # avoid each dataloader worker running one BLAS/OpenMP thread per core,
+    # the pools are already initialized at fork so env variables would have no effect
+    threadpool_limits(1)
+
+
 def train(config):
 
     def get_dataloader(dataset, batch_size, collate_fn, shuffle=False, pin_memory=True):
+        num_workers = config.pipeline.dataloader.num_workers
+
+        try:
+            prefetch_factor = config.pipeline.dataloader.prefetch_factor
+        except AttributeError:
+            prefetch_factor = 4
+
+        # keep workers alive across epochs, prefetch_factor is only valid with workers
+        worker_kwargs = {}
+        if num_workers > 0:
+            worker_kwargs = dict(persistent_workers=True,
+                                 prefetch_factor=prefetch_factor,
+                                 worker_init_fn=worker_init)
+
         return DataLoader(dataset,
                           batch_size=batch_size,
                           collate_fn=collate_fn,
                           shuffle=shuffle,
-                          num_workers=config.pipeline.dataloader.num_workers,
-                          pin_memory=pin_memory)
+                          num_workers=num_workers,
+                          pin_memory=pin_memory,
+                          **worker_kwargs)
 
     def get_model(config):
         try:
@@ -69,6 +97,23 @@ def train(config):
                               mapping_bound_2d=bound_2d,
                               scaling_factors=scaling_factors,
                               binary_seg_layer=binary_segmentation_layer)
+
+            # only the dense 2D encoders benefit from NHWC, the sparse trunk is left as is
+            m.encoders2d = m.encoders2d.to(memory_format=torch.channels_last)
+
+            try:
+                compile_bev = config.model.compile_bev
+            except AttributeError:
+                compile_bev = False
+
+            # BEV maps have a fixed size per level (bev_img_sizes must not change during the run),
+            # so the dense encoders can be compiled and replayed with CUDA graphs (opt-in, needs torch >= 2.0).
+            # Only forward is compiled to keep state_dict keys unchanged, the sparse trunk stays eager.
+            if compile_bev and hasattr(torch, 'compile'):
+                for k in m.encoders2d.keys():
+                    m.encoders2d[k].forward = torch.compile(m.encoders2d[k].forward,
+                                                            mode='reduce-overhead',
+                                                            fullgraph=False)
         else:
             raise NotImplementedError
         print(f'--> Using {config.model.name}!')
@@ -115,6 +160,11 @@ def train(config):
             except AttributeError:
                 bound_2d = 50.
 
+            try:
+                mmap_cache_path = config.source_dataset.mmap_cache_path
+            except AttributeError:
+                mmap_cache_path = None
+
             training_dataset_tmp, validation_dataset_tmp = get_dataset(dataset_name=dataset_name,
                                                                        voxel_size=config.source_dataset.voxel_size,
                                                                        sub_p=config.source_dataset.sub_p,
@@ -125,7 +175,8 @@ def train(config):
                                                                        scale_bev=config.pipeline.scale_bev,
                                                                        decoder_2d_levels=config.model.decoder_2d_levels,
                                                                        bev_img_sizes=config.model.bev_img_sizes,
-                                                                       bound_2d=bound_2d)
+                                                                       bound_2d=bound_2d,
+                                                                       mmap_cache_path=mmap_cache_path)
 
             training_dataset.append(training_dataset_tmp)
             validation_dataset.append(validation_dataset_tmp)
@@ -149,27 +200,17 @@ def train(config):
         if len(all_names) == 0:
             return None, None
         else:
-            all_dates = [n[:16] for n in all_names]
-            years = [int(n[:4]) for n in all_dates]
-            months = [int(n[5:7]) for n in all_dates]
-            days = [int(n[8:10]) for n in all_dates]
-            h = [int(n[11:13]) for n in all_dates]
-            m = [int(n[14:16]) for n in all_dates]
-            last_idx = np.argmax(np.array(years) * 365 * 24 * 60 + np.array(months) * 30 * 24 * 60 + np.array(days) * 24 * 60 + np.array(h) * 60 + np.array(m))
-            last_path = all_names[last_idx]
+            # run names start with a zero-padded YYYY_MM_DD_HH:MM timestamp, so they sort lexicographically
+            last_path = max(all_names, key=lambda n: n[:16])
 
             # among all checkpoints we need to find the last
             all_ckpt = os.listdir(os.path.join(save_path, last_path, "checkpoints"))
-            ep = [e[6:8] for e in all_ckpt]
-            ckpts = []
-            for e in ep:
-                if not e.endswith("-"):
-                    ckpts.append(int(e))
-                else:
-                    ckpts.append(int(e[0]))
-            last_idx = np.argmax(np.array(ckpts))
+            all_ckpt = [c for c in all_ckpt if c.endswith('.ckpt') and re.match(r'epoch=?(\d+)', c) is not None]
+            if len(all_ckpt) == 0:
+                return None, last_path
+            last_ckpt = max(all_ckpt, key=lambda c: int(re.match(r'epoch=?(\d+)', c).group(1)))
 
-            return os.path.join(save_path, last_path, "checkpoints", all_ckpt[last_idx]), last_path
+            return os.path.join(save_path, last_path, "checkpoints", last_ckpt), last_path
 
     model = get_model(config)
 
@@ -183,6 +224,11 @@ def train(config):
                                          batch_size=config.pipeline.dataloader.batch_size,
                                          shuffle=True)
 
+    # with ddp lightning needs the DataLoader itself to inject the distributed sampler
+    if len(config.pipeline.gpus) == 1 and torch.cuda.is_available():
+        training_dataloader = CUDAPrefetcher(training_dataloader,
+                                             device=torch.device('cuda', config.pipeline.gpus[0]))
+
     if len(config.source_dataset.name) > 1:
         validation_dataloader = [get_dataloader(v_dataset, collate_fn=collation_single, batch_size=config.pipeline.dataloader.batch_size, shuffle=False) for v_dataset in validation_dataset]
     else:
@@ -219,13 +265,19 @@ def train(config):
 
     loggers = [wandb_logger]
 
-    checkpoint_callback = [ModelCheckpoint(dirpath=os.path.join(save_dir, 'checkpoints'),
-                                           save_on_train_epoch_end=True,
-                                           every_n_epochs=1,
-                                           save_top_k=-1)]
+    checkpoint_callback = [AsyncModelCheckpoint(dirpath=os.path.join(save_dir, 'checkpoints'),
+                                                save_on_train_epoch_end=True,
+                                                every_n_epochs=1,
+                                                save_top_k=-1)]
+
+    try:
+        use_sync_bn = config.pipeline.use_sync_bn
+    except AttributeError:
+        use_sync_bn = True
 
     if len(config.pipeline.gpus) > 1:
-        model = ME.MinkowskiSyncBatchNorm.convert_sync_batchnorm(model)
+        if use_sync_bn:
+            model = ME.MinkowskiSyncBatchNorm.convert_sync_batchnorm(model)
         strategy = 'ddp'
     else:
         strategy = None
@@ -283,11 +335,18 @@ def train(config):
     else:
         raise ValueError('Source dataset number is not valid')
 
+    # bf16 does not need grad scaling and does not underflow the losses as fp16 does
+    bf16_supported = hasattr(torch.cuda, 'is_bf16_supported') and torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+    if config.pipeline.precision in (16, '16', 'bf16') and bf16_supported:
+        precision = 'bf16'
+    else:
+        precision = config.pipeline.precision
+
     trainer = Trainer(max_epochs=config.pipeline.epochs,
                       gpus=config.pipeline.gpus,
                       strategy=strategy,
                       default_root_dir=config.pipeline.save_dir,
-                      precision=config.pipeline.precision,
+                      precision=precision,
                       logger=loggers,
                       check_val_every_n_epoch=config.pipeline.lightning.check_val_every_n_epoch,
                       val_check_interval=config.pipeline.lightning.val_check_interval,
@@ -307,10 +366,13 @@ if __name__ == '__main__':
     config = get_config(args.config_file)
 
     # fix random seed
-    os.environ['PYTHONHASHSEED'] = str(config.pipeline.seed)
+    # PYTHONHASHSEED is only read at interpreter start, export it in the launch script if needed
     np.random.seed(config.pipeline.seed)
     torch.manual_seed(config.pipeline.seed)
     torch.cuda.manual_seed(config.pipeline.seed)
     torch.backends.cudnn.benchmark = True
+    # let cudnn pick the fastest, non-deterministic, algorithms
+    if hasattr(torch, 'use_deterministic_algorithms'):
+        torch.use_deterministic_algorithms(False)
 
     train(config)
@@ -9,12 +9,16 @@ class RandomRotation:
     def _M(self, axis, theta):
         return expm(np.cross(np.eye(3), axis / norm(axis) * theta))
 
-    def __call__(self, coords, r=None, is_bev=False):
+    def get_matrix(self, r=None):
         if r is None:
             R = self._M(
                 np.random.rand(3) - 0.5, np.pi/4 * (np.random.rand(1) - 0.5))
         else:
             R = r
+        return R, R
+
+    def __call__(self, coords, r=None, is_bev=False):
+        R, _ = self.get_matrix(r)
         if not is_bev:
             return coords @ R
         else:
@@ -27,13 +31,22 @@ class RandomScale:
         self.scale = max - min
         self.bias = min
 
-    def __call__(self, coords, s=None, is_bev=False):
+    def _sample(self, s=None):
         if s is None:
             s_x = self.scale * np.random.rand(1) + self.bias
             s_y = self.scale * np.random.rand(1) + self.bias
             s_z = self.scale * np.random.rand(1) + self.bias
         else:
             s_x, s_y, s_z = s
+        return s_x, s_y, s_z
+
+    def get_matrix(self, s=None):
+        s_x, s_y, s_z = self._sample(s)
+        S = np.diag(np.asarray([s_x, s_y, s_z], dtype=np.float64).reshape(-1))
+        return S, [s_x, s_y, s_z]
+
+    def __call__(self, coords, s=None, is_bev=False):
+        s_x, s_y, s_z = self._sample(s)
 
         coords[:, 0] = coords[:, 0] * s_x
         coords[:, 1] = coords[:, 1] * s_y
@@ -0,0 +1,73 @@
+import os
+import threading
+from weakref import proxy
+
+import torch
+import pytorch_lightning as pl
+from pytorch_lightning.callbacks import ModelCheckpoint
+from pytorch_lightning.utilities import rank_zero_warn
+from pytorch_lightning.utilities.apply_func import apply_to_collection
+
+
+class AsyncModelCheckpoint(ModelCheckpoint):
+    r"""
+    ModelCheckpoint that writes to disk in a background thread.
+    The checkpoint is snapshotted on CPU in the training loop, then saved to a temporary
+    file and renamed, so training does not stall on slow (e.g., NFS) writes and a partial
+    file is never picked up by auto resume.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._save_thread = None
+        self._save_error = None
+
+    def _save_checkpoint(self, trainer: "pl.Trainer", filepath: str) -> None:
+        checkpoint = trainer._checkpoint_connector.dump_checkpoint(self.save_weights_only)
+
+        self._last_global_step_saved = trainer.global_step
+
+        if trainer.is_global_zero:
+            # gpu tensors keep being updated by training, copy them before leaving the main thread
+            checkpoint = apply_to_collection(checkpoint, torch.Tensor,
+                                             lambda t: t.detach().clone() if t.device.type == 'cpu' else t.detach().cpu())
+
+            # one write at a time, the previous one must be on disk before starting a new one
+            self.wait()
+            self._save_thread = threading.Thread(target=self._bg_save,
+                                                 args=(trainer.strategy.checkpoint_io, checkpoint, filepath))
+            self._save_thread.start()
+
+            # notify loggers
+            for logger in trainer.loggers:
+                logger.after_save_checkpoint(proxy(self))
+
+    def _bg_save(self, checkpoint_io, checkpoint: dict, filepath: str) -> None:
+        tmp_filepath = filepath + '.tmp'
+        try:
+            self._fs.makedirs(os.path.dirname(filepath), exist_ok=True)
+            checkpoint_io.save_checkpoint(checkpoint, tmp_filepath)
+            self._fs.mv(tmp_filepath, filepath)
+        except BaseException as e:
+            # re-raised in the training loop by wait()
+            self._save_error = e
+            if self._fs.exists(tmp_filepath):
+                self._fs.rm(tmp_filepath)
+
+    def wait(self, raise_error: bool = True) -> None:
+        if self._save_thread is not None:
+            self._save_thread.join()
+            self._save_thread = None
+
+        if self._save_error is not None:
+            error, self._save_error = self._save_error, None
+            if raise_error:
+                raise error
+            rank_zero_warn(f'Background checkpoint write failed: {error!r}')
+
+    def on_train_end(self, trainer: "pl.Trainer", pl_module: "pl.LightningModule") -> None:
+        self.wait()
+
+    def on_exception(self, trainer: "pl.Trainer", pl_module: "pl.LightningModule", exception: BaseException) -> None:
+        # do not hide the exception already in flight
+        self.wait(raise_error=False)
@@ -0,0 +1,64 @@
+import torch
+
+
+class CUDAPrefetcher:
+    r"""
+    Wraps a dataloader and copies the next batch to the GPU on a side stream
+    while the current one is being processed (as in apex main_amp.py).
+    Batches can be tensors or (nested) dicts/lists of tensors.
+    """
+
+    def __init__(self, loader, device):
+        self.loader = loader
+        self.device = torch.device(device)
+        self.stream = torch.cuda.Stream(device=self.device)
+        self.iterator = None
+        self.next_batch = None
+
+    def __len__(self):
+        return len(self.loader)
+
+    def __iter__(self):
+        self.iterator = iter(self.loader)
+        self.preload()
+        return self
+
+    def __next__(self):
+        torch.cuda.current_stream(self.device).wait_stream(self.stream)
+        batch = self.next_batch
+        if batch is None:
+            raise StopIteration
+        # tensors were allocated on the side stream, now used on the main one
+        self._record_stream(batch)
+        self.preload()
+        return batch
+
+    def preload(self):
+        try:
+            batch = next(self.iterator)
+        except StopIteration:
+            self.next_batch = None
+            return
+
+        with torch.cuda.stream(self.stream):
+            self.next_batch = self._to_device(batch)
+
+    def _to_device(self, data):
+        if isinstance(data, torch.Tensor):
+            return data.to(self.device, non_blocking=True)
+        elif isinstance(data, dict):
+            return {k: self._to_device(v) for k, v in data.items()}
+        elif isinstance(data, (list, tuple)):
+            return type(data)(self._to_device(v) for v in data)
+        else:
+            return data
+
+    def _record_stream(self, data):
+        if isinstance(data, torch.Tensor):
+            data.record_stream(torch.cuda.current_stream(self.device))
+        elif isinstance(data, dict):
+            for v in data.values():
+                self._record_stream(v)
+        elif isinstance(data, (list, tuple)):
+            for v in data:
+                self._record_stream(v)
@@ -38,16 +38,30 @@ class ComposeBEV:
 
     def __init__(self, transforms):
         self.transforms = transforms
+        # linear transforms expose get_matrix and are composed instead of being applied one by one
+        self.is_linear = [hasattr(t, 'get_matrix') for t in self.transforms]
 
     def __call__(self, img, params=None):
         tr_params = []
+        # consecutive linear transforms are folded into one matrix
+        # and applied to the points with a single matmul, the others are applied as they come
+        M = None
         for i, t in enumerate(self.transforms):
             if params is not None:
                 p = params[i]
             else:
                 p = None
-            img, tr = t(img, p, is_bev=True)
+            if self.is_linear[i]:
+                T, tr = t.get_matrix(p)
+                M = T if M is None else M @ T
+            else:
+                if M is not None:
+                    img = img @ M
+                    M = None
+                img, tr = t(img, p, is_bev=True)
             tr_params.append(tr)
+        if M is not None:
+            img = img @ M
         return img, tr_params
 
     def __repr__(self):
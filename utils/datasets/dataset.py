@@ -49,12 +49,68 @@ class BaseDataset(Dataset):
         self.maps = None
         self.color_map = None
 
+        self.mmap_points = None
+        self.mmap_labels = None
+        self.mmap_offsets = None
+
     def __len__(self):
         raise NotImplementedError
 
     def __getitem__(self, i: int):
         raise NotImplementedError
 
+    def load_raw(self, i: int) -> (np.ndarray, np.ndarray):
+        """
+        :param i: index of the scan
+        :return: points of shape [N, 4] (xyz + intensity) in float32 and mapped labels of shape [N] in int32
+        """
+        raise NotImplementedError
+
+    def raw_paths(self) -> list:
+        """
+        :return: source file of each scan, in the order used by load_raw
+        """
+        raise NotImplementedError
+
+    def cache_meta(self) -> dict:
+        """
+        :return: what the output of load_raw depends on, saved with the cache and checked when loading it
+        """
+        paths = [os.path.relpath(p, self.dataset_path) for p in self.raw_paths()]
+        return {'paths': np.asarray(paths), 'learning_map': np.asarray(self.learning_map)}
+
+    def load_mmap_cache(self, cache_path: str):
+        """
+        :param cache_path: folder written by prepare_cache.py with points.mmap, labels.mmap, meta.npz and offsets.npy
+        """
+        self.mmap_offsets = np.load(os.path.join(cache_path, 'offsets.npy'))
+
+        assert self.mmap_offsets.shape[0] == len(self) + 1, f'Cache in {cache_path} does not match the dataset length'
+
+        cache_meta = np.load(os.path.join(cache_path, 'meta.npz'))
+        for k, v in self.cache_meta().items():
+            assert k in cache_meta and np.array_equal(cache_meta[k], v), f'Cache in {cache_path} was built with a different {k}'
+
+        num_points = int(self.mmap_offsets[-1])
+        self.mmap_points = np.memmap(os.path.join(cache_path, 'points.mmap'), dtype=np.float32, mode='r', shape=(num_points, 4))
+        self.mmap_labels = np.memmap(os.path.join(cache_path, 'labels.mmap'), dtype=np.int32, mode='r', shape=(num_points,))
+
+        # the mapping is shared by all workers through the page cache,
+        # the per-worker dict cache would only keep private copies of the same scans
+        self.use_cache = False
+
+    def get_raw(self, i: int) -> (np.ndarray, np.ndarray):
+        """
+        :param i: index of the scan
+        :return: points and labels as in load_raw, sliced from the memory-mapped cache if loaded
+        """
+        if self.mmap_offsets is None:
+            return self.load_raw(i)
+
+        start, end = self.mmap_offsets[i], self.mmap_offsets[i+1]
+        # copy out of the read-only mapping, augmentations work in place
+        return np.array(self.mmap_points[start:end]), np.array(self.mmap_labels[start:end])
+
     def random_sample(self, points: np.ndarray, center: np.array = None) -> np.array:
         """
         :param points: input points of shape [N, 3]
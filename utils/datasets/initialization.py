@@ -34,7 +34,8 @@ def get_dataset(dataset_name: str,
                 decoder_2d_levels: list = ['block8'],
                 bev_img_sizes: list = [240],
                 bound_2d: float = 50.,
-                method: str = None) -> (BaseDataset, BaseDataset):
+                method: str = None,
+                mmap_cache_path: str = None) -> (BaseDataset, BaseDataset):
 
     '''
         :param dataset_name: name of the dataset
@@ -50,6 +51,7 @@ def get_dataset(dataset_name: str,
         :param bev_img_sizes: dimension of the BEV map
         :param bound_2d: the 2D bounds for the 2D bev image
         :param method: method used for the completion task
+        :param mmap_cache_path: folder with the memory-mapped caches of prepare_cache.py (BEV training sets only)
         :return:
     '''
 
@@ -479,5 +481,8 @@ def get_dataset(dataset_name: str,
     else:
         raise NotImplementedError
 
+    if mmap_cache_path is not None and dataset_name.endswith('-BEV'):
+        training_dataset.load_mmap_cache(os.path.join(mmap_cache_path, dataset_name))
+
     return training_dataset, validation_dataset
 
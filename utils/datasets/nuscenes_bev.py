@@ -187,21 +187,29 @@ class NuScenesBEVDataset(BaseDataset):
 
         return in_bound_idx
 
-    def __getitem__(self, i: int):
+    def raw_paths(self):
+        return self.pcd_path
+
+    def load_raw(self, i: int):
         pcd_tmp = self.pcd_path[i]
         label_tmp = self.label_path[i]
 
-        if i not in self.CACHE.keys():
+        pcd = np.fromfile(pcd_tmp, dtype=np.float32).reshape((-1, 5))
+        sem_labels = self.load_label_nusc(label_tmp)
 
-            pcd = np.fromfile(pcd_tmp, dtype=np.float32).reshape((-1, 5))
-            sem_labels = self.load_label_nusc(label_tmp)
+        assert pcd.shape[0] == sem_labels.shape[0], f'Points and labels have shape {pcd.shape[0]} and {sem_labels.shape[0]}'
 
-            assert pcd.shape[0] == sem_labels.shape[0], f'Points and labels have shape {pcd.shape[0]} and {sem_labels.shape[0]}'
+        return pcd[:, :4], sem_labels
+
+    def __getitem__(self, i: int):
+
+        if i not in self.CACHE.keys():
 
+            pcd, sem_labels = self.get_raw(i)
             points = pcd[:, :3]
 
             if self.use_intensity:
-                colors = points[:, 3][..., np.newaxis]
+                colors = pcd[:, 3][..., np.newaxis]
             else:
                 colors = np.ones((points.shape[0], 1), dtype=np.float32)
 
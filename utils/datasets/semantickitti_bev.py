@@ -174,22 +174,35 @@ class SemanticKITTIBEVDataset(BaseDataset):
     def __len__(self):
         return len(self.pcd_path)
 
-    def __getitem__(self, i: int):
+    def raw_paths(self):
+        return self.pcd_path
+
+    def cache_meta(self):
+        # scans are cropped to in_R in load_raw
+        meta = super().cache_meta()
+        meta['in_R'] = np.asarray(self.in_R)
+        return meta
+
+    def load_raw(self, i: int):
         pcd_tmp = self.pcd_path[i]
         label_tmp = self.label_path[i]
 
+        pcd = np.fromfile(pcd_tmp, dtype=np.float32).reshape((-1, 4))
+        sem_labels = self.load_label_kitti(label_tmp)
+
+        mask = np.sum(np.square(pcd[:, :3]), axis=1) < self.in_R ** 2
+
+        return pcd[mask], sem_labels[mask]
+
+    def __getitem__(self, i: int):
+
         if i not in self.CACHE.keys():
 
-            pcd = np.fromfile(pcd_tmp, dtype=np.float32).reshape((-1, 4))
-            sem_labels = self.load_label_kitti(label_tmp)
+            pcd, sem_labels = self.get_raw(i)
             points = pcd[:, :3]
 
-            mask = np.sum(np.square(points), axis=1) < self.in_R ** 2
-            points = points[mask]
-            sem_labels = sem_labels[mask]
-
             if self.use_intensity:
-                colors = points[:, 3][..., np.newaxis]
+                colors = pcd[:, 3][..., np.newaxis]
             else:
                 colors = np.ones((points.shape[0], 1), dtype=np.float32)
 
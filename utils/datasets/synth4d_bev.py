@@ -210,7 +210,10 @@ class Synth4DBEVDataset(BaseDataset):
 
         return t_soft
 
-    def __getitem__(self, i):
+    def raw_paths(self):
+        return self.path_list
+
+    def load_raw(self, i):
 
         pc_path = self.path_list[i]
         input_points = np.load(pc_path).astype(np.float32)
@@ -219,15 +222,19 @@ class Synth4DBEVDataset(BaseDataset):
         dir, _ = os.path.split(dir)
         label_path = os.path.join(dir, 'labels', file[:-4] + '.npy')
 
-        _, town = os.path.split(dir)
+        if not os.path.exists(label_path):
+            labels = np.zeros(np.shape(input_points)[0], dtype=np.int32)
+        else:
+            labels = np.load(label_path).astype(np.int32).reshape([-1])
+            labels = self.learning_map[labels]
+
+        return input_points[:, :4], labels
+
+    def __getitem__(self, i):
 
         if i not in self.CACHE:
 
-            if not os.path.exists(label_path):
-                labels = np.zeros(np.shape(input_points)[0], dtype=np.int32)
-            else:
-                labels = np.load(label_path).astype(np.int32).reshape([-1])
-                labels = self.learning_map[labels]
+            input_points, labels = self.get_raw(i)
 
             if self.use_intensity:
                 colors = input_points[:, 3][..., np.newaxis]
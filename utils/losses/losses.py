@@ -25,6 +25,32 @@ class CELoss(nn.Module):
         return loss
 
 
+def fused_bev_ce(bev_preds: dict, bev_labels: dict, num_classes: int, ignore_label: int = None) -> dict:
+    '''
+    Same per level values as CELoss (unweighted), with one cross entropy call over all the levels
+    :param bev_preds: dict of level predictions, viewed as [-1, num_classes]
+    :param bev_labels: dict of level labels with the same keys
+    :param num_classes: number of classes
+    :param ignore_label: label to ignore
+    :return: dict of per level losses, NaN for a level with only ignored pixels as in CELoss
+    '''
+    keys = list(bev_labels.keys())
+
+    preds = torch.cat([bev_preds[k].view(-1, num_classes) for k in keys], dim=0).cpu()
+    labels = torch.cat([bev_labels[k].view(-1) for k in keys], dim=0).cpu()
+    level_idx = torch.cat([torch.full((bev_labels[k].numel(),), l, dtype=torch.long) for l, k in enumerate(keys)], dim=0)
+
+    pixel_loss = F.cross_entropy(preds, labels, ignore_index=ignore_label, reduction='none')
+
+    valid_idx = torch.logical_not(labels == ignore_label)
+    num_valid = torch.bincount(level_idx[valid_idx], minlength=len(keys))
+
+    # accumulate in float32, a bf16 sum over ~1e5 pixels stops growing after a few hundred
+    level_loss = torch.zeros(len(keys), dtype=torch.float32).index_add_(0, level_idx, pixel_loss.float()) / num_valid
+
+    return dict(zip(keys, level_loss))
+
+
 class SoftCELoss(nn.Module):
     def __init__(self, dim=-1, ignore_index=None):
         super(SoftCELoss, self).__init__()
@@ -155,6 +155,14 @@ class MinkUNetBaseBEV(nn.Module):
 
         self.scaled_pool2d = nn.ModuleDict(scaled_pool2d)
 
+        # pooling of each decoder level, resolved once instead of per sample in sparse2super
+        self.level_pool2d = {}
+        for k in self.decoder_2d_level:
+            if self.scaling_factors[k] == 1.0:
+                self.level_pool2d[k] = self.pool2D
+            else:
+                self.level_pool2d[k] = self.scaled_pool2d[str(int(self.scaling_factors[k]*100))]
+
     def filter_bounds(self, points):
 
         pts_x = points[:, 0]
@@ -166,13 +174,11 @@ class MinkUNetBaseBEV(nn.Module):
 
         return in_bound_idx
 
-    def sparse2super(self, x, input_voxel_size=0.05, scaling_factor=1.0):
-        batched_bev_feat_maps = []
+    def sparse2super(self, x, input_voxel_size=0.05, scaling_factor=1.0, pool2d=None):
 
         batch_bottle_coords, batch_bottle_feats = x.C, x.F
         # batch_bottle_feats = self.relu_2d(batch_bottle_feats)
-        batch_bottle_coords = batch_bottle_coords.cpu()
-        batch_bottle_idx = batch_bottle_coords[:, 0]
+        batch_bottle_idx = batch_bottle_coords[:, 0].long()
         batch_bottle_xyz = batch_bottle_coords[:, 1:] * input_voxel_size
 
         quantized_min_x = self.mapping_boundaries[0][0]
@@ -181,51 +187,45 @@ class MinkUNetBaseBEV(nn.Module):
         quantized_max_y = self.mapping_boundaries[1][1]
 
 
-        max_height = torch.tensor((quantized_max_y - quantized_min_y) / input_voxel_size).int()
-        max_width = torch.tensor((quantized_max_x - quantized_min_x) / input_voxel_size).int()
+        max_height = int((quantized_max_y - quantized_min_y) / input_voxel_size)
+        max_width = int((quantized_max_x - quantized_min_x) / input_voxel_size)
+
+        if pool2d is None:
+            if scaling_factor == 1.0:
+                pool2d = self.pool2D
+            else:
+                # if lower res is used we scale the max pooling
+                pool2d = self.scaled_pool2d[str(int(scaling_factor*100))]
 
 
         feat_size = batch_bottle_feats.shape[-1]
+        batch_size = int(batch_bottle_idx.max()) + 1
 
         """ top view x-y projection of the input point cloud"""
         """ max image size maxImgWidth=512 times maxImgHeight=64 """
 
-        for b in range(batch_bottle_idx.max()+1):
+        # due to approx some points may be on the border
+        in_bounds_idx = self.filter_bounds(batch_bottle_xyz)
 
-            b_bottle_idx = batch_bottle_idx == b
-            # features of the bottleneck points
-            bottle_b_feats = batch_bottle_feats[b_bottle_idx]
-            # coordinates of the bottleneck points
-            bottle_b_coords = batch_bottle_xyz[b_bottle_idx]
+        bottle_feats = batch_bottle_feats[in_bounds_idx]
+        bottle_coords = batch_bottle_xyz[in_bounds_idx]
+        bottle_idx = batch_bottle_idx[in_bounds_idx]
 
-            # due to approx some points may be on the border
-            in_bounds_idx = self.filter_bounds(bottle_b_coords)
+        valid_x = bottle_coords[:, 0]
+        valid_y = bottle_coords[:, 1]
 
-            bottle_b_feats = bottle_b_feats[in_bounds_idx]
-            bottle_b_coords = bottle_b_coords[in_bounds_idx]
+        pixel_x = torch.floor((valid_x - quantized_min_x) / input_voxel_size).long()
+        pixel_y = torch.floor(max_height - (valid_y - quantized_min_y) / input_voxel_size).long() - 1
 
-            valid_x = bottle_b_coords[:, 0]
-            valid_y = bottle_b_coords[:, 1]
-            valid_z = bottle_b_coords[:, 2]
+        # whole batch scattered at once on the features device
+        bev_feats = torch.zeros((batch_size, max_height, max_width, feat_size), dtype=bottle_feats.dtype, device=x.device)
+        bev_feats[bottle_idx, pixel_y, pixel_x] = bottle_feats
 
-            b_bev_feats = torch.zeros((max_height, max_width, feat_size)).to(x.device)
+        # with voxel_size 0.05 and boundaries [-50, 50], bev_feats shape is [666, 666]
+        batched_bev_feat_maps = pool2d(bev_feats.view(batch_size, -1, max_height, max_width))
 
-            pixel_x = torch.floor((valid_x - quantized_min_x) / input_voxel_size).long()
-            pixel_y = torch.floor(max_height - (valid_y - quantized_min_y) / input_voxel_size).long() - 1
-            # pixel_z = torch.floor((valid_z - quantized_min_z) / input_voxel_size).long().to(x.device)
-
-            b_bev_feats[pixel_y.to(x.device), pixel_x.to(x.device)] = bottle_b_feats
-
-            if scaling_factor == 1.0:
-                # with voxel_size 0.05 and boundaries [-50, 50], b_bev_feats hape is [666, 666]
-                b_bev_feats = self.pool2D(b_bev_feats.view(1, -1, max_height, max_width))
-            else:
-                # if lower res is used we scale the max pooling
-                b_bev_feats = self.scaled_pool2d[str(int(scaling_factor*100))](b_bev_feats.view(1, -1, max_height, max_width))
-
-            batched_bev_feat_maps.append(b_bev_feats.to(x.device))
-
-        batched_bev_feat_maps = torch.cat(batched_bev_feat_maps, dim=0)
+        # NHWC layout for the 2D encoders (faster cudnn kernels with AMP)
+        batched_bev_feat_maps = batched_bev_feat_maps.contiguous(memory_format=torch.channels_last)
 
         return batched_bev_feat_maps
 
@@ -379,14 +379,17 @@ class MinkUNetBaseBEV(nn.Module):
 
             for key in self.encoders2d.keys():
 
-                bev_feats_lvl = self.sparse2super(x=input_bev_feats[key], scaling_factor=self.scaling_factors[key])
+                bev_feats_lvl = self.sparse2super(x=input_bev_feats[key],
+                                                  scaling_factor=self.scaling_factors[key],
+                                                  pool2d=self.level_pool2d[key])
 
+                # predictions are viewed by the losses, back to NCHW contiguous
                 if not self.binary_seg:
-                    img_pred[key] = self.encoders2d[key](bev_feats_lvl)
+                    img_pred[key] = self.encoders2d[key](bev_feats_lvl).contiguous()
                 else:
                     img_pred_tmp = self.encoders2d[key](bev_feats_lvl)
-                    img_pred[key] = img_pred_tmp[0]
-                    img_pred[key+'_binary'] = img_pred_tmp[1]
+                    img_pred[key] = img_pred_tmp[0].contiguous()
+                    img_pred[key+'_binary'] = img_pred_tmp[1].contiguous()
 
         else:
             bev_feat_map = None
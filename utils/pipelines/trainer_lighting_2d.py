@@ -174,10 +174,19 @@ class PLTTrainer2D(pl.core.LightningModule):
         # for logging also the dict
         loss_dict_bev = {}
 
+        if isinstance(self.sem_bev_criterion, CELoss) and not self.soft_bev_labels:
+            level_losses = fused_bev_ce(bev_preds0, bev_sem_labels0,
+                                        num_classes=self.num_classes,
+                                        ignore_label=self.sem_bev_criterion.ignored_label)
+        else:
+            level_losses = None
+
         # iterate over decoders
         for key in bev_sem_labels0.keys():
             # get decoder key loss
-            if not self.soft_bev_labels:
+            if level_losses is not None:
+                sem_loss_bev0_tmp = level_losses[key]
+            elif not self.soft_bev_labels:
                 sem_loss_bev0_tmp = self.sem_bev_criterion(bev_preds0[key].view(-1, self.num_classes).cpu(),
                                                            bev_sem_labels0[key].view(-1).cpu())
             else: